@@ -0,0 +1,220 @@
+import logging
+import json
+from time import time
+import zmq
+
+from timetag.binner import BufferBinner, HistBinner, FretHistBinner
+from timetag.managed_binner import ManagedBinner
+
+# Bumped whenever the frame format changes incompatibly
+PROTOCOL_VERSION = 1
+default_endpoint = 'ipc:///tmp/timetag-analysis'
+
+def encode_frame(topic, header, payload=b''):
+    header = dict(header, version=PROTOCOL_VERSION)
+    return [topic.encode('ascii'), json.dumps(header).encode('utf-8'), payload]
+
+def decode_frame(parts):
+    topic, header, payload = parts
+    return topic.decode('ascii'), json.loads(header.decode('utf-8')), payload
+
+class Publisher(ManagedBinner):
+    """ Runs a binner whose results are published under topic.
+
+        Each frame's header carries the binner's epoch, incremented each
+        time the binner is started, and a sequence number incremented
+        with each frame, allowing subscribers to detect missed frames and
+        request a new snapshot by resubscribing.
+    """
+    topic = None
+    publish_period = 1 # seconds
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.epoch = 0
+        self.seq = 0
+        self.needs_snapshot = True
+        ManagedBinner.__init__(self, pipeline, self.topic)
+
+    def on_started(self):
+        self.epoch += 1
+        self.needs_snapshot = True
+
+    def on_stopped(self):
+        self.needs_snapshot = True
+
+    def _header(self, kind):
+        self.seq += 1
+        return {'kind': kind, 'epoch': self.epoch, 'seq': self.seq,
+                'running': self.is_running(), 'clockrate': self.pipeline.clockrate}
+
+    def snapshot(self):
+        """ A frame giving the complete current state """
+        self.needs_snapshot = False
+        return self._header('snapshot'), b''
+
+    def update(self):
+        """ A frame giving the changes since the last frame, or None if
+            there is nothing to publish """
+        if self.needs_snapshot:
+            return self.snapshot()
+        return None
+
+class BinSeriesPublisher(Publisher):
+    topic = 'bin-series'
+    publish_period = 1. / 12
+
+    def __init__(self, pipeline, bin_time=10e-3, n_points=1000):
+        self.bin_time = bin_time
+        self.n_points = n_points
+        self._published = [0]*4
+        Publisher.__init__(self, pipeline)
+
+    def create_binner(self):
+        binner = BufferBinner(self.bin_time, self.pipeline.clockrate)
+        binner.resize_buffer(self.n_points)
+        return binner
+
+    def _frame(self, kind):
+        """ Collect the bins of each channel not yet published, or all
+            buffered bins for a snapshot """
+        binner = self.get_binner()
+        header = self._header(kind)
+        header.update({'bin_time': self.bin_time, 'n_points': self.n_points})
+        if binner is None:
+            return header, b''
+
+        channels = []
+        payload = []
+        for n, c in enumerate(binner.channels):
+            with c._buffer_lock:
+                bins = c.counts.get()
+                new = c.bin_count - self._published[n]
+                if kind != 'snapshot':
+                    bins = bins[len(bins)-min(new, len(bins)):]
+                self._published[n] = c.bin_count
+                channels.append({'n_bins': len(bins), 'photon_count': c.photon_count})
+                payload.append(bins.tobytes())
+
+        header.update({'channels': channels,
+                       'latest_timestamp': binner.latest_timestamp,
+                       'loss_count': binner.loss_count})
+        return header, b''.join(payload)
+
+    def snapshot(self):
+        self.needs_snapshot = False
+        return self._frame('snapshot')
+
+    def update(self):
+        if self.needs_snapshot or self.get_binner() is None:
+            return Publisher.update(self)
+        return self._frame('delta')
+
+class HistPublisher(Publisher):
+    topic = 'hist'
+
+    def __init__(self, pipeline, bin_time=10e-3, hist_width=1):
+        self.bin_time = bin_time
+        self.hist_width = hist_width
+        Publisher.__init__(self, pipeline)
+
+    def create_binner(self):
+        return HistBinner(bin_time = self.bin_time,
+                          clockrate = self.pipeline.clockrate,
+                          hist_width = self.hist_width)
+
+    def snapshot(self):
+        header, payload = Publisher.snapshot(self)
+        header.update({'bin_time': self.bin_time, 'hist_width': self.hist_width})
+        binner = self.get_binner()
+        if binner is not None:
+            header['channels'] = [sorted(h.items()) for h in binner.channels]
+        return header, payload
+
+    def update(self):
+        # Histograms are small; always publish them in full
+        return self.snapshot()
+
+class FretHistPublisher(Publisher):
+    topic = 'fret-hist'
+
+    def __init__(self, pipeline, bin_time=10e-3, nbins=40, threshold=10,
+                 donor_channel=0, acceptor_channel=1):
+        self.bin_time = bin_time
+        self.nbins = nbins
+        self.threshold = threshold
+        self.donor_channel = donor_channel
+        self.acceptor_channel = acceptor_channel
+        Publisher.__init__(self, pipeline)
+
+    def create_binner(self):
+        binner = FretHistBinner(self.bin_time, self.pipeline.clockrate)
+        binner.donor_channel = self.donor_channel
+        binner.acceptor_channel = self.acceptor_channel
+        binner.threshold = self.threshold
+        binner.hist_width = 1. / self.nbins
+        return binner
+
+    def snapshot(self):
+        header, payload = Publisher.snapshot(self)
+        header.update({'bin_time': self.bin_time,
+                       'hist_width': 1. / self.nbins,
+                       'threshold': self.threshold,
+                       'donor_channel': self.donor_channel,
+                       'acceptor_channel': self.acceptor_channel})
+        binner = self.get_binner()
+        if binner is not None:
+            header['hist'] = sorted(binner.hist.items())
+        return header, payload
+
+    def update(self):
+        return self.snapshot()
+
+class AnalysisDaemon(object):
+    """ Publishes the results of a set of Publishers on an XPUB socket.
+        A full snapshot of a topic is sent whenever a client subscribes
+        to it, after which updates are sent every publish_period seconds,
+        so the cost of running the binners is independent of the number
+        of clients. """
+    def __init__(self, publishers, endpoint=default_endpoint):
+        self.publishers = publishers
+        self._zmq = zmq.Context.instance()
+        self._sock = self._zmq.socket(zmq.XPUB)
+        # Pass all subscriptions through so that each new subscriber
+        # gets a snapshot
+        self._sock.setsockopt(zmq.XPUB_VERBOSE, 1)
+        self._sock.bind(endpoint)
+        logging.info('Publishing analysis results on %s' % endpoint)
+
+    def _send(self, pub, frame):
+        header, payload = frame
+        self._sock.send_multipart(encode_frame(pub.topic, header, payload))
+
+    def _handle_subscription(self, msg):
+        if msg[:1] != b'\x01': return
+        prefix = msg[1:].decode('ascii')
+        for pub in self.publishers:
+            if pub.topic.startswith(prefix):
+                logging.debug('New subscriber to %s' % pub.topic)
+                self._send(pub, pub.snapshot())
+
+    def run(self):
+        next_publish = [0] * len(self.publishers)
+        while True:
+            timeout = max(0, min(next_publish) - time())
+            if self._sock.poll(int(1000 * timeout)):
+                self._handle_subscription(self._sock.recv())
+                continue
+
+            now = time()
+            for i, pub in enumerate(self.publishers):
+                if now < next_publish[i]: continue
+                next_publish[i] = now + pub.publish_period
+                frame = pub.update()
+                if frame is not None:
+                    self._send(pub, frame)
+
+    def stop(self):
+        for pub in self.publishers:
+            pub.stop_binner()
+        self._sock.close()
@@ -1,6 +1,7 @@
 import logging
 import time
 import pkgutil
+import numpy as np
 
 import gobject, gtk
 import matplotlib
@@ -10,6 +11,7 @@ from matplotlib.backends.backend_gtkagg import FigureCanvasGTKAgg
 from matplotlib.backends.backend_gtkcairo import FigureCanvasGTKCairo
 
 from timetag.binner import BufferBinner
+from timetag.remote_binner import RemoteBufferBinner
 from timetag.managed_binner import ManagedBinner
 from timetag import config
 
@@ -20,8 +22,9 @@ def fix_color(c):
 class BinSeriesPlot(ManagedBinner):
         FigureCanvas = FigureCanvasGTK
 
-        def __init__(self, pipeline):
+        def __init__(self, pipeline, step_log=None, remote=None):
                 self.pipeline = pipeline
+                self.step_log = step_log
                 self.builder = gtk.Builder()
                 src = pkgutil.get_data('timetag', 'bin_series.glade')
                 self.builder.add_from_string(src)
@@ -36,8 +39,11 @@ class BinSeriesPlot(ManagedBinner):
 
                 self.running = True
                 self._setup_plot()
+                if remote is not None:
+                        # Binning is configured by the analysis daemon
+                        self.builder.get_object('bin_time_spin').props.sensitive = False
                 self.win.show_all()
-		ManagedBinner.__init__(self, self.pipeline, 'bin-series')
+		ManagedBinner.__init__(self, self.pipeline, 'bin-series', remote)
 
 	def on_started(self):
 		self._start_fps_display()
@@ -71,14 +77,25 @@ class BinSeriesPlot(ManagedBinner):
                 self.axes.set_xlabel('Time (s)')
                 self.axes.set_ylabel('Counts per bin')
                 self.lines = {}
+                self.step_lines = {}
                 canvas = self.__class__.FigureCanvas(self.figure)
                 self.builder.get_object('plot_container').pack_start(canvas)
 
         def create_binner(self):
                 binner = BufferBinner(self.bin_time, self.pipeline.clockrate)
 		binner.resize_buffer(self.n_points)
+                if self.builder.get_object('detect_steps').props.active:
+                        threshold = self.builder.get_object('step_threshold').props.value
+                        binner.enable_step_detection(threshold=threshold, log=self.step_log)
 		return binner
 
+        def create_remote_binner(self, endpoint):
+                binner = RemoteBufferBinner(endpoint)
+                if self.builder.get_object('detect_steps').props.active:
+                        threshold = self.builder.get_object('step_threshold').props.value
+                        binner.enable_step_detection(threshold=threshold, log=self.step_log)
+                return binner
+
         def _update_plot(self):
                 max_counts = 1
                 clockrate = self.pipeline.clockrate
@@ -98,6 +115,8 @@ class BinSeriesPlot(ManagedBinner):
                         else:
                                 self.lines[n].set_data(bins['time'], bins['counts'])
 
+                        self._update_steps(n, channel)
+
                 self.axes.relim()
 
                 # Scale X axis:
@@ -121,10 +140,35 @@ class BinSeriesPlot(ManagedBinner):
                         ymin, ymax = self.y_bounds
                 self.axes.set_ylim(ymin, ymax)
 
+                if self.remote is not None:
+                        self._show_remote_settings(binner)
+
                 self.figure.canvas.draw()
                 self.frame_cnt += 1
 		return self.is_running()
 
+        def _show_remote_settings(self, binner):
+                """ Show the binning settings of the analysis daemon """
+                if binner.bin_time is not None:
+                        self.builder.get_object('bin_time').props.value = 1e3 * binner.bin_time
+
+        def _update_steps(self, n, channel):
+                """ Overlay the detected intensity steps of a channel """
+                with channel._buffer_lock:
+                        segs = None if channel.steps is None else channel.steps.get()
+                if segs is None or len(segs) == 0:
+                        if n in self.step_lines:
+                                self.step_lines.pop(n).remove()
+                        return
+
+                x = np.column_stack([segs['start'], segs['end']]).ravel()
+                y = np.repeat(segs['level'], 2)
+                if n not in self.step_lines:
+                        self.step_lines[n], = self.axes.plot(x, y, color=self.colors[n],
+                                                             linestyle='--', linewidth=2)
+                else:
+                        self.step_lines[n].set_data(x, y)
+
         @property
         def plot_width(self):
                 return self.builder.get_object('x_width').props.value
@@ -156,4 +200,8 @@ class BinSeriesPlot(ManagedBinner):
                                          get_object('y_upper').props.value)
 
         def bin_time_changed_cb(self, *args):
+                if self.remote is None:
+                        self.restart_binner()
+
+        def step_detection_changed_cb(self, *args):
                 self.restart_binner()
@@ -7,6 +7,7 @@ import os
 import subprocess
 from collections import defaultdict
 from ringbuffer import RingBuffer
+from change_point import ChangePointDetector
 
 bin_dtype = np.dtype([('time', 'f'), ('counts', 'u4')])
 
@@ -117,7 +118,9 @@ class BufferBinner(Binner):
             def __init__(self, npts):
                     self._buffer_lock = threading.Lock()
                     self.photon_count = 0
+                    self.bin_count = 0
                     self.latest_timestamp = 0
+                    self.steps = None
                     self.resize(npts)
 
             def resize(self, npts):
@@ -134,6 +137,13 @@ class BufferBinner(Binner):
         for c in self.channels:
             c.resize(npts)
 
+    def enable_step_detection(self, log=None, **kwargs):
+        """ Start detecting intensity steps in each channel's bins. See
+            ChangePointDetector for arguments. """
+        for n,c in enumerate(self.channels):
+            with c._buffer_lock:
+                c.steps = ChangePointDetector(log=log, label=str(n), **kwargs)
+
     def handle_bin(self, channel, start_time, count, lost):
         c = self.channels[channel]
         start_time = 1.0*start_time / self.clockrate
@@ -141,4 +151,7 @@ class BufferBinner(Binner):
         with c._buffer_lock:
             c.counts.append((start_time, count))
             c.photon_count += count
+            c.bin_count += 1
             c.latest_timestamp = start_time
+            if c.steps is not None:
+                c.steps.add_bin(start_time, count)
@@ -0,0 +1,246 @@
+import logging
+import os
+import json
+import sqlite3
+from glob import glob
+from collections import namedtuple
+
+from timetag.records import RecordReader, channel_counts
+
+default_catalog_path = os.path.expanduser('~/.timetag/catalog.db')
+
+schema = """
+CREATE TABLE IF NOT EXISTS runs (
+    path TEXT PRIMARY KEY,
+    mtime REAL,
+    meta_mtime REAL,
+    size INTEGER,
+    start TEXT,
+    description TEXT,
+    clockrate INTEGER,
+    n_records INTEGER,
+    first_time INTEGER,
+    last_time INTEGER,
+    duration REAL,
+    loss_sprees INTEGER,
+    metadata TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_start ON runs(start);
+CREATE INDEX IF NOT EXISTS runs_duration ON runs(duration);
+
+CREATE TABLE IF NOT EXISTS run_counts (
+    path TEXT,
+    channel TEXT,
+    photons INTEGER,
+    PRIMARY KEY (path, channel)
+);
+
+CREATE TABLE IF NOT EXISTS run_channels (
+    path TEXT,
+    channel TEXT,
+    label TEXT,
+    PRIMARY KEY (path, channel)
+);
+CREATE INDEX IF NOT EXISTS run_channels_label ON run_channels(label);
+
+CREATE TABLE IF NOT EXISTS run_metadata (
+    path TEXT,
+    key TEXT,
+    value TEXT,
+    PRIMARY KEY (path, key)
+);
+CREATE INDEX IF NOT EXISTS run_metadata_kv ON run_metadata(key, value);
+"""
+
+class Run(namedtuple('Run', 'path,start,description,clockrate,n_records,duration,loss_sprees,metadata,counts')):
+    """ A handle to a cataloged recording """
+    def open(self, chunk_size=2**20):
+        """ Open a chunked reader over the recording's records """
+        return RecordReader(self.path, chunk_size,
+                            segments=self.metadata.get('segments'))
+
+def meta_path(path):
+    return path + '.meta'
+
+def load_metadata(path):
+    """ Load the .meta sidecar of a recording, if one exists """
+    if not os.path.isfile(meta_path(path)):
+        return {}
+    try:
+        return json.load(open(meta_path(path)))
+    except Exception as e:
+        logging.warn('Failed to load metadata for %s: %s' % (path, e))
+        return {}
+
+def summarize(path, segments=None):
+    """ Compute summary statistics of a recording in a single pass """
+    counts = {}
+    for c in range(4):
+        counts['strobe%d' % c] = 0
+        counts['delta%d' % c] = 0
+    n_records = 0
+    loss_sprees = 0
+    first_time = None
+    last_time = None
+
+    for recs in RecordReader(path, segments=segments):
+        if len(recs) == 0: continue
+        n_records += len(recs)
+        loss_sprees += int(recs['lost'].sum())
+        if first_time is None:
+            first_time = int(recs['time'][0])
+        last_time = int(recs['time'][-1])
+        for c, n in enumerate(channel_counts(recs)):
+            counts['strobe%d' % c] += n
+        for c, n in enumerate(channel_counts(recs, delta=True)):
+            counts['delta%d' % c] += n
+
+    return {
+        'n_records': n_records,
+        'loss_sprees': loss_sprees,
+        'first_time': first_time,
+        'last_time': last_time,
+        'counts': counts,
+    }
+
+class Catalog(object):
+    """ An SQLite-backed index of recordings and their metadata """
+    def __init__(self, db_path=default_catalog_path):
+        dirname = os.path.dirname(db_path)
+        if not os.path.exists(dirname) and len(dirname) > 0:
+            os.makedirs(dirname)
+        self.db_path = db_path
+        self._db = sqlite3.connect(db_path)
+        self._db.executescript(schema)
+
+    def close(self):
+        self._db.close()
+        self._db = None
+
+    def _is_current(self, path):
+        row = self._db.execute('SELECT mtime, meta_mtime, size FROM runs WHERE path=?',
+                               (path,)).fetchone()
+        if row is None:
+            return False
+        mtime, meta_mtime, size = row
+        st = os.stat(path)
+        m = meta_path(path)
+        return mtime == st.st_mtime and size == st.st_size \
+            and meta_mtime == (os.stat(m).st_mtime if os.path.exists(m) else None)
+
+    def add_run(self, path, force=False):
+        """ Index a recording, skipping it if it is unchanged since it
+            was last indexed """
+        path = os.path.abspath(path)
+        if not force and self._is_current(path):
+            return False
+
+        logging.info('Indexing %s' % path)
+        st = os.stat(path)
+        m = meta_path(path)
+        meta_mtime = os.stat(m).st_mtime if os.path.exists(m) else None
+        metadata = load_metadata(path)
+        clockrate = metadata.get('clockrate')
+        summary = summarize(path, metadata.get('segments'))
+
+        duration = None
+        if clockrate and summary['first_time'] is not None:
+            duration = 1. * (summary['last_time'] - summary['first_time']) / clockrate
+
+        with self._db:
+            self._remove(path)
+            self._db.execute('INSERT INTO runs VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)',
+                             (path, st.st_mtime, meta_mtime, st.st_size,
+                              metadata.get('start'), metadata.get('description'),
+                              clockrate, summary['n_records'],
+                              summary['first_time'], summary['last_time'],
+                              duration, summary['loss_sprees'],
+                              json.dumps(metadata)))
+            self._db.executemany('INSERT INTO run_counts VALUES (?,?,?)',
+                                 [(path, c, n) for c, n in summary['counts'].items()])
+            self._db.executemany('INSERT INTO run_channels VALUES (?,?,?)',
+                                 [(path, c, l) for c, l in metadata.get('channels', {}).items()])
+            self._db.executemany('INSERT INTO run_metadata VALUES (?,?,?)',
+                                 [(path, k, u'%s' % v) for k, v in metadata.items()
+                                  if not isinstance(v, (dict, list))])
+        return True
+
+    def _remove(self, path):
+        for table in ['runs', 'run_counts', 'run_channels', 'run_metadata']:
+            self._db.execute('DELETE FROM %s WHERE path=?' % table, (path,))
+
+    def remove_run(self, path):
+        with self._db:
+            self._remove(os.path.abspath(path))
+
+    def rescan(self, dirs, pattern='*.timetag'):
+        """ Bring the catalog up to date with the recordings found under
+            the given directories, reindexing those whose modification
+            time has changed and dropping those which no longer exist """
+        found = set()
+        for d in dirs:
+            d = os.path.abspath(d)
+            for root, subdirs, files in os.walk(d):
+                for path in glob(os.path.join(root, pattern)):
+                    found.add(path)
+                    try:
+                        self.add_run(path)
+                    except Exception as e:
+                        logging.warn('Failed to index %s: %s' % (path, e))
+
+            known = self._db.execute('SELECT path FROM runs').fetchall()
+            for path, in known:
+                if not path.startswith(os.path.join(d, '')): continue
+                if path not in found and not os.path.exists(path):
+                    logging.info('Dropping %s' % path)
+                    self.remove_run(path)
+
+    def query(self, since=None, until=None, channel=None,
+              min_duration=None, max_duration=None, **metadata):
+        """ Find runs matching the given criteria. since and until bound
+            the run start time (as ISO 8601 strings or datetimes), channel
+            matches either a channel name (e.g. 'strobe0') or its label,
+            and any remaining keyword arguments must match top-level
+            metadata values (e.g. sample='ABC'). """
+        clauses = []
+        args = []
+        if since is not None:
+            clauses.append('start >= ?')
+            args.append(str(since.isoformat() if hasattr(since, 'isoformat') else since))
+        if until is not None:
+            clauses.append('start < ?')
+            args.append(str(until.isoformat() if hasattr(until, 'isoformat') else until))
+        if min_duration is not None:
+            clauses.append('duration >= ?')
+            args.append(min_duration)
+        if max_duration is not None:
+            clauses.append('duration <= ?')
+            args.append(max_duration)
+        if channel is not None:
+            clauses.append('path IN (SELECT path FROM run_channels WHERE channel=? OR label=?)')
+            args += [channel, channel]
+        for k, v in metadata.items():
+            clauses.append('path IN (SELECT path FROM run_metadata WHERE key=? AND value=?)')
+            args += [k, u'%s' % v]
+
+        sql = 'SELECT path, start, description, clockrate, n_records, duration, loss_sprees, metadata FROM runs'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY start'
+
+        runs = []
+        for row in self._db.execute(sql, args).fetchall():
+            counts = dict(self._db.execute('SELECT channel, photons FROM run_counts WHERE path=?',
+                                           (row[0],)).fetchall())
+            runs.append(Run(*(row[:-1] + (json.loads(row[-1]), counts))))
+        return runs
+
+def index_run(path, db_path=default_catalog_path):
+    """ Add a single recording to the catalog """
+    catalog = Catalog(db_path)
+    try:
+        catalog.add_run(path)
+    except Exception as e:
+        logging.warn('Failed to catalog %s: %s' % (path, e))
+    finally:
+        catalog.close()
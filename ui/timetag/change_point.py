@@ -0,0 +1,107 @@
+import logging
+import numpy as np
+
+from timetag.ringbuffer import RingBuffer
+
+segment_dtype = np.dtype([('start', 'f'), ('end', 'f'), ('level', 'f')])
+
+class ChangePointDetector(object):
+    """ Online detection of intensity steps in a series of Poisson
+        distributed bin counts.
+
+        The current segment's mean level is estimated from its bins. Two
+        CUSUM statistics accumulate the log-likelihood ratio of the level
+        having stepped up or down by a factor of step_ratio. When either
+        exceeds threshold the segment is closed at the point where that
+        statistic last left zero, and a new segment begins there. Each
+        bin costs O(1) work and memory is bounded by the max_segments
+        closed segments kept.
+
+        Closed segments are appended to the segments ring buffer and, if
+        given, written to log as tab-separated start time, end time and
+        level lines, preceded by label if one is given.
+    """
+    def __init__(self, threshold=10, step_ratio=1.5, min_bins=10,
+                 max_segments=1000, log=None, label=None):
+        self.threshold = threshold
+        self.step_ratio = step_ratio
+        self.min_bins = min_bins
+        self.log = log
+        self.label = label
+        self.segments = RingBuffer(max_segments, dtype=segment_dtype)
+        self._log_up = np.log(step_ratio)
+        self._last = None
+        self._reset()
+
+    def _reset(self, start=None, counts=0, nbins=0):
+        self._start = start
+        self._sum = counts
+        self._n = nbins
+        # CUSUM statistics and the bins accumulated since each left zero
+        self._up, self._up_start, self._up_sum, self._up_n = 0, None, 0, 0
+        self._down, self._down_start, self._down_sum, self._down_n = 0, None, 0, 0
+
+    def add_bin(self, time, count):
+        """ Add a bin starting at time (in seconds) """
+        if self._start is None:
+            self._start = time
+        self._last = time
+        self._sum += count
+        self._n += 1
+        if self._n < self.min_bins:
+            return
+
+        mu = max(self._sum, 0.5) / self._n
+        r = self.step_ratio
+        llr_up = count * self._log_up - mu * (r - 1)
+        llr_down = mu * (1 - 1. / r) - count * self._log_up
+
+        self._up += llr_up
+        if self._up <= 0:
+            self._up, self._up_start, self._up_sum, self._up_n = 0, None, 0, 0
+        else:
+            if self._up_start is None: self._up_start = time
+            self._up_sum += count
+            self._up_n += 1
+
+        self._down += llr_down
+        if self._down <= 0:
+            self._down, self._down_start, self._down_sum, self._down_n = 0, None, 0, 0
+        else:
+            if self._down_start is None: self._down_start = time
+            self._down_sum += count
+            self._down_n += 1
+
+        if self._up > self.threshold:
+            self._split(self._up_start, self._up_sum, self._up_n)
+        elif self._down > self.threshold:
+            self._split(self._down_start, self._down_sum, self._down_n)
+
+    def _split(self, time, counts, nbins):
+        """ Close the current segment at time, the remaining counts and
+            nbins bins starting the next segment """
+        level = 1. * (self._sum - counts) / max(self._n - nbins, 1)
+        seg = (self._start, time, level)
+        self.segments.append(seg)
+        if self.log is not None:
+            line = '%f\t%f\t%f\n' % seg
+            if self.label is not None:
+                line = '%s\t%s' % (self.label, line)
+            self.log.write(line)
+            self.log.flush()
+        logging.debug('Intensity step at %f s: level %f counts/bin' % (time, level))
+        self._reset(time, counts, nbins)
+
+    def current(self):
+        """ The currently open segment """
+        if self._start is None or self._n == 0:
+            return None
+        return (self._start, self._last, 1. * self._sum / self._n)
+
+    def get(self):
+        """ Closed segments followed by the open segment, oldest first """
+        segs = self.segments.get()
+        cur = self.current()
+        if cur is None:
+            return segs
+        return np.concatenate([segs, np.array([cur], dtype=segment_dtype)])
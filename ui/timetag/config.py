@@ -20,6 +20,15 @@ default_rc = {
         (False, 'Delta 3'),
         (False, 'Delta 4'),
         ],
+    'triggered-recording': {
+        'enabled': False,
+        'channels': [0, 1],
+        'threshold': 10,         # photons
+        'window': 1e-3,          # seconds
+        'pre-trigger': 10e-3,    # seconds
+        'post-trigger': 10e-3,   # seconds
+        'holdoff': 0,            # seconds
+        },
     }
 
 rc_path = os.path.expanduser('~/.timetagrc')
@@ -28,7 +37,13 @@ def load_rc():
     rc = deepcopy(default_rc)
     if os.path.isfile(rc_path):
         try:
-            rc.update(json.load(open(rc_path)))
+            user_rc = json.load(open(rc_path))
+            # Sections given as dicts may set only some of their keys
+            for k,v in user_rc.items():
+                if isinstance(v, dict) and isinstance(rc.get(k), dict):
+                    rc[k].update(v)
+                else:
+                    rc[k] = v
         except Exception as e:
             logging.warn('Warning: Failed to load RC: %s' % e)
     else:
@@ -0,0 +1,171 @@
+import logging
+import threading
+import os
+import numpy as np
+
+from timetag.records import RECORD_LENGTH, RecordReader, unpack_records, decode_records
+from timetag.catalog import load_metadata
+
+class DelayHistogram(object):
+    """ Log-binned histograms of photon delays, updated incrementally from
+        batches of decoded records in constant memory.
+
+        For each channel the inter-photon time distribution is
+        accumulated in ipt[channel]. For each (start, stop) channel pair
+        in pairs, cross[(start, stop)] accumulates the delay from each
+        stop photon to the preceding start photon (e.g. donor to
+        acceptor). Delays are binned in bins_per_decade logarithmically
+        spaced bins between min_lag and max_lag seconds. Bin edges are
+        rounded up to whole clock ticks, merging bins narrower than a
+        tick, so edges gives the range of integer lags each bin holds.
+    """
+    def __init__(self, clockrate, min_lag=1e-8, max_lag=1, bins_per_decade=10,
+                 channels=range(4), pairs=[(0, 1)]):
+        if not 0 < min_lag < max_lag:
+            raise ValueError('Delay histogram requires 0 < min_lag < max_lag')
+        self.clockrate = clockrate
+        self.channels = list(channels)
+        self.pairs = list(pairs)
+        # No delay is shorter than a clock tick
+        min_lag = max(min_lag, 1. / clockrate)
+        ndecades = np.log10(1. * max_lag / min_lag)
+        nbins = max(1, int(np.ceil(ndecades * bins_per_decade)))
+        edges = np.logspace(np.log10(min_lag), np.log10(max_lag), nbins+1)
+        # Round before taking the ceiling to absorb floating point error
+        ticks = np.unique(np.ceil(np.round(edges * clockrate, 6)).astype('u8'))
+        if len(ticks) < 2:
+            raise ValueError('Delay histogram lag range is shorter than a clock tick')
+        self._edge_ticks = ticks
+        self.edges = ticks / float(clockrate)
+        self.reset()
+
+    def reset(self):
+        nbins = len(self.edges) - 1
+        self.ipt = {c: np.zeros(nbins, dtype='u8') for c in self.channels}
+        self.cross = {p: np.zeros(nbins, dtype='u8') for p in self.pairs}
+        self.break_stream()
+
+    def break_stream(self):
+        """ Mark a discontinuity in the record stream (e.g. between the
+            segments of a triggered recording) across which no delays
+            should be measured """
+        self._last = {}
+
+    @property
+    def centers(self):
+        """ The geometric centers of the bins in seconds """
+        return np.sqrt(self.edges[1:] * self.edges[:-1])
+
+    def _accumulate(self, hist, delays):
+        bins = np.searchsorted(self._edge_ticks, delays, 'right') - 1
+        bins = bins[(bins >= 0) & (bins < len(hist))]
+        hist += np.bincount(bins, minlength=len(hist)).astype('u8')
+
+    def update(self, recs):
+        """ Add a batch of decoded records to the histograms """
+        strobe = ~recs['delta']
+        masks = {}
+        times = {}
+        for c in set(self.channels) | set(c for p in self.pairs for c in p):
+            masks[c] = strobe & ((recs['channels'] & (1 << c)) != 0)
+            times[c] = recs['time'][masks[c]]
+
+        for start, stop in self.pairs:
+            # Index of the most recent start photon preceding each stop photon
+            idx = np.cumsum(masks[start])[masks[stop]] - 1
+            t = times[start]
+            if start in self._last:
+                t = np.concatenate([[self._last[start]], t]).astype('u8')
+                idx += 1
+            valid = idx >= 0
+            self._accumulate(self.cross[(start, stop)],
+                             times[stop][valid] - t[idx[valid]])
+
+        for c in self.channels:
+            t = times[c]
+            if len(t) == 0: continue
+            if c in self._last:
+                delays = np.diff(np.concatenate([[self._last[c]], t]).astype('u8'))
+            else:
+                delays = np.diff(t)
+            self._accumulate(self.ipt[c], delays)
+
+        for c, t in times.items():
+            if len(t) > 0:
+                self._last[c] = t[-1]
+
+    def save(self, fname):
+        """ Write the histograms to a text file, one row per bin """
+        cols = [self.edges[:-1], self.edges[1:]]
+        names = ['lag_start', 'lag_end']
+        for c in self.channels:
+            cols.append(self.ipt[c])
+            names.append('ipt%d' % c)
+        for start, stop in self.pairs:
+            cols.append(self.cross[(start, stop)])
+            names.append('delay%d-%d' % (start, stop))
+        np.savetxt(fname, np.column_stack(cols), header='\t'.join(names),
+                   delimiter='\t', fmt='%g')
+
+class DelayBinner(object):
+    """ Feeds the record stream written to get_data_fd() into a
+        DelayHistogram. Follows the interface of Binner so that it may be
+        used with ManagedBinner. """
+    def __init__(self, clockrate, chunk_size=2**14, **kwargs):
+        self.clockrate = clockrate
+        self.chunk_size = chunk_size
+        self.hist = DelayHistogram(clockrate, **kwargs)
+        self.hist_lock = threading.Lock()
+        self.loss_count = 0
+        self._time_offset = 0
+        self._first = True
+
+        r, w = os.pipe()
+        self._pipe_r = os.fdopen(r, 'rb')
+        self._pipe_w = os.fdopen(w, 'wb')
+        self.listener = threading.Thread(name='Delay Listener', target=self._listen)
+        self.listener.daemon = True
+        self.listener.start()
+
+    def get_data_fd(self):
+        return self._pipe_w
+
+    def stop(self):
+        # The listener exits once the writer closes its end of the pipe
+        self._pipe_w.close()
+
+    def _listen(self):
+        chunk_bytes = self.chunk_size * RECORD_LENGTH
+        rest = b''
+        while True:
+            # Take whatever is available to keep latency low
+            data = os.read(self._pipe_r.fileno(), chunk_bytes)
+            if len(data) == 0: break
+            buf = rest + data
+            n = len(buf) - len(buf) % RECORD_LENGTH
+            buf, rest = buf[:n], buf[n:]
+            if n == 0: continue
+            recs, self._time_offset = decode_records(unpack_records(buf),
+                                                     self._time_offset, self._first)
+            self._first = False
+            self.loss_count += int(recs['lost'].sum())
+            with self.hist_lock:
+                self.hist.update(recs)
+        self._pipe_r.close()
+        logging.debug('Delay listener finished')
+
+def delay_hist_file(path, clockrate=None, chunk_size=2**16, **kwargs):
+    """ Compute the delay histograms of a recorded file """
+    metadata = load_metadata(path)
+    if clockrate is None:
+        clockrate = metadata['clockrate']
+    hist = DelayHistogram(clockrate, **kwargs)
+    segments = metadata.get('segments')
+    # Delays spanning the gap between segments aren't those of the sample
+    readers = [RecordReader(path, chunk_size, segments=[s]) for s in segments] \
+              if segments else [RecordReader(path, chunk_size)]
+    for reader in readers:
+        hist.break_stream()
+        for recs in reader:
+            hist.update(recs)
+    return hist
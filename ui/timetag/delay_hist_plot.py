@@ -0,0 +1,95 @@
+import pkgutil
+
+import gobject, gtk
+import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_gtk import FigureCanvasGTK
+
+from timetag.delay_hist import DelayBinner
+from timetag.managed_binner import ManagedBinner
+from timetag import config
+
+def fix_color(c):
+        c = gtk.gdk.color_parse(c)
+        return (c.red_float, c.green_float, c.blue_float)
+
+class DelayHistPlot(ManagedBinner):
+        FigureCanvas = FigureCanvasGTK
+
+        def __init__(self, pipeline):
+                self.pipeline = pipeline
+                self.builder = gtk.Builder()
+                src = pkgutil.get_data('timetag', 'delay_hist.glade')
+                self.builder.add_from_string(src)
+                self.builder.connect_signals(self)
+                self.win = self.builder.get_object('delay_hist_window')
+                self.win.connect('destroy', self.destroy_cb)
+                self.update_rate = 1 # Hz
+
+                rc = config.load_rc()
+                self.colors = {n: fix_color(chan.color)
+                               for (n,chan) in enumerate(rc['strobe-channels'])
+                               if chan.enabled
+                               }
+
+                self.figure = Figure()
+                self.axes = self.figure.add_subplot(111)
+                canvas = self.__class__.FigureCanvas(self.figure)
+                self.builder.get_object('plot_container').pack_start(canvas)
+                self.win.show_all()
+                ManagedBinner.__init__(self, self.pipeline, 'delay-hist-plot')
+
+        def create_binner(self):
+                get_obj = self.builder.get_object
+                model = get_obj('channel_model')
+                start = model[get_obj('start_combo').get_active_iter()][0]
+                stop = model[get_obj('stop_combo').get_active_iter()][0]
+                min_lag = get_obj('min_lag').get_value()
+                # Cover at least a decade should the limits cross
+                max_lag = max(get_obj('max_lag').get_value(), min_lag + 1)
+                return DelayBinner(self.pipeline.clockrate,
+                                   min_lag = 10**min_lag,
+                                   max_lag = 10**max_lag,
+                                   bins_per_decade = get_obj('bins_per_decade').get_value(),
+                                   channels = self.colors.keys(),
+                                   pairs = [(start, stop)])
+
+        def on_started(self):
+                gobject.timeout_add(int(1000.0 / self.update_rate), self._update_plot,
+                                    priority=gobject.PRIORITY_DEFAULT_IDLE)
+
+        def destroy_cb(self, a):
+                self.stop_binner()
+                gtk.main_quit()
+
+        def _update_plot(self):
+                binner = self.get_binner()
+                if binner is None: return False
+                hist = binner.hist
+                with binner.hist_lock:
+                        ipt = {c: h.copy() for c,h in hist.ipt.items()}
+                        cross = {p: h.copy() for p,h in hist.cross.items()}
+
+                # Normalize counts by bin width to give a density
+                widths = hist.edges[1:] - hist.edges[:-1]
+                self.axes.cla()
+                for c,h in ipt.items():
+                        if h.sum() == 0: continue
+                        self.axes.step(hist.centers, h / widths, where='mid',
+                                       color=self.colors[c], label='Channel %d' % (c+1))
+                for (start,stop),h in cross.items():
+                        if h.sum() == 0: continue
+                        self.axes.step(hist.centers, h / widths, where='mid', color='k',
+                                       label='Channel %d to %d' % (start+1, stop+1))
+                self.axes.set_xscale('log')
+                self.axes.set_yscale('log', nonposy='clip')
+                self.axes.set_xlim(hist.edges[0], hist.edges[-1])
+                self.axes.set_xlabel('Delay (s)')
+                self.axes.set_ylabel('Events per second of delay')
+                if self.axes.lines:
+                        self.axes.legend(loc='upper right', prop={'size': 'small'})
+                self.figure.canvas.draw()
+                return True
+
+        def binning_config_changed_cb(self, *args):
+                self.restart_binner()
@@ -10,12 +10,13 @@ from matplotlib.backends.backend_gtkcairo import FigureCanvasGTKCairo
 from collections import defaultdict
 
 from timetag.binner import FretHistBinner
+from timetag.remote_binner import RemoteFretHistBinner
 from timetag.managed_binner import ManagedBinner
 
 class FretHistPlot(ManagedBinner):
         FigureCanvas = FigureCanvasGTK
 
-        def __init__(self, pipeline):
+        def __init__(self, pipeline, remote=None):
                 self.pipeline = pipeline
                 self.builder = gtk.Builder()
                 src = pkgutil.get_data('timetag', 'fret_hist.glade')
@@ -24,6 +25,11 @@ class FretHistPlot(ManagedBinner):
                 self.win = self.builder.get_object('hist_window')
                 self.win.connect('destroy', self.destroy_cb)
                 self.update_rate = 0.3 # Hz
+                if remote is not None:
+                        # Binning is configured by the analysis daemon
+                        for w in ['bin_time_spin', 'nbins_spin', 'threshold_spin',
+                                  'donor_combo', 'acceptor_combo']:
+                                self.builder.get_object(w).props.sensitive = False
 
                 self.figure = Figure()
                 self.axes = self.figure.add_subplot(111)
@@ -33,7 +39,7 @@ class FretHistPlot(ManagedBinner):
                 canvas = self.__class__.FigureCanvas(self.figure)
                 self.builder.get_object('plot_container').pack_start(canvas)
                 self.win.show_all()
-                ManagedBinner.__init__(self, self.pipeline, "fret-hist-plot")
+                ManagedBinner.__init__(self, self.pipeline, "fret-hist-plot", remote)
 
         def create_binner(self):
                 get_obj = self.builder.get_object
@@ -45,6 +51,9 @@ class FretHistPlot(ManagedBinner):
                 binner.hist_width = 1. / get_obj('nbins').get_value()
                 return binner
                 
+        def create_remote_binner(self, endpoint):
+                return RemoteFretHistBinner(endpoint)
+
         def on_started(self):
                 gobject.timeout_add(int(1000.0 / self.update_rate), self._update_plot,
                                     priority=gobject.PRIORITY_DEFAULT_IDLE)
@@ -53,6 +62,20 @@ class FretHistPlot(ManagedBinner):
         def bin_time(self):
                 return 1e-3 * self.builder.get_object('bin_time').props.value
 
+        def _show_remote_settings(self, binner):
+                """ Show the binning settings of the analysis daemon """
+                get_obj = self.builder.get_object
+                if binner.bin_time is not None:
+                        get_obj('bin_time').props.value = 1e3 * binner.bin_time
+                        get_obj('threshold').props.value = binner.threshold
+                get_obj('nbins').props.value = round(1. / binner.hist_width)
+                model = get_obj('channel_model')
+                for combo, channel in [('donor_combo', binner.donor_channel),
+                                       ('acceptor_combo', binner.acceptor_channel)]:
+                        for row in model:
+                                if row[0] == channel:
+                                        get_obj(combo).set_active_iter(row.iter)
+
         def destroy_cb(self, a):
                 self.stop_binner()
                 gtk.main_quit()
@@ -60,6 +83,8 @@ class FretHistPlot(ManagedBinner):
         def _update_plot(self):
                 binner = self.get_binner()
                 if binner is None: return False
+                if self.remote is not None:
+                        self._show_remote_settings(binner)
                 hist_width = binner.hist_width
                 hist = binner.hist
                 if len(hist) == 0: return True
@@ -72,8 +97,10 @@ class FretHistPlot(ManagedBinner):
                 return True
 
         def binning_config_changed_cb(self, *args):
-                self.restart_binner()
+                if self.remote is None:
+                        self.restart_binner()
 
         def bin_time_changed_cb(self, adj):
-                self.restart_binner()
+                if self.remote is None:
+                        self.restart_binner()
 
@@ -10,6 +10,7 @@ from matplotlib.backends.backend_gtkcairo import FigureCanvasGTKCairo
 from collections import defaultdict
 
 from timetag.binner import HistBinner
+from timetag.remote_binner import RemoteHistBinner
 from timetag.managed_binner import ManagedBinner
 from timetag import config
 
@@ -20,7 +21,7 @@ def fix_color(c):
 class HistPlot(ManagedBinner):
         FigureCanvas = FigureCanvasGTK
 
-        def __init__(self, pipeline):
+        def __init__(self, pipeline, remote=None):
                 self.builder = gtk.Builder()
                 src = pkgutil.get_data('timetag', 'hist.glade')
                 self.builder.add_from_string(src)
@@ -35,6 +36,11 @@ class HistPlot(ManagedBinner):
                                for (n,chan) in enumerate(rc['strobe-channels'])
                                if chan.enabled
                                }
+                if remote is not None:
+                        # Binning is configured by the analysis daemon
+                        for w in ['bin_width_spin', 'hist_width_spin']:
+                                self.builder.get_object(w).props.sensitive = False
+
                 self.figure = Figure()
                 self.axes = {}
                 for n in self.colors:
@@ -46,7 +52,7 @@ class HistPlot(ManagedBinner):
                 canvas = self.__class__.FigureCanvas(self.figure)
                 self.builder.get_object('plot_container').pack_start(canvas)
                 self.win.show_all()
-                ManagedBinner.__init__(self, self.pipeline, 'hist-plot')
+                ManagedBinner.__init__(self, self.pipeline, 'hist-plot', remote)
 
         def create_binner(self):
                 return HistBinner(bin_time = self.bin_time,
@@ -54,6 +60,9 @@ class HistPlot(ManagedBinner):
                                   hist_width = self.hist_width
                                   )
 
+        def create_remote_binner(self, endpoint):
+                return RemoteHistBinner(endpoint)
+
         def on_started(self):
                 gobject.timeout_add(int(1000.0 / self.update_rate), self._update_plot,
                                     priority=gobject.PRIORITY_DEFAULT_IDLE)
@@ -63,18 +72,27 @@ class HistPlot(ManagedBinner):
                 gtk.main_quit()
 
         def _update_plot(self):
-                if self.get_binner() is None: return False
-                for c,hist in enumerate(self.get_binner().channels):
+                binner = self.get_binner()
+                if binner is None: return False
+                for c,hist in enumerate(binner.channels):
                         if len(hist) == 0: continue
                         if c not in self.axes: continue
                         self.axes[c].cla()
                         self.axes[c].bar(hist.keys(), hist.values(),
-                                         self.hist_width, color=self.colors[c])
+                                         binner.hist_width, color=self.colors[c])
                         self.axes[c].relim()
 
+                if self.remote is not None:
+                        self._show_remote_settings(binner)
                 self.figure.canvas.draw()
                 return True
 
+        def _show_remote_settings(self, binner):
+                """ Show the binning settings of the analysis daemon """
+                if binner.bin_time is not None:
+                        self.builder.get_object('bin_width').props.value = binner.bin_time
+                self.builder.get_object('hist_width').props.value = binner.hist_width
+
         @property
         def bin_time(self):
                 return self.builder.get_object('bin_width').props.value
@@ -84,8 +102,10 @@ class HistPlot(ManagedBinner):
                 return self.builder.get_object('hist_width').props.value
 
         def bin_width_changed_cb(self, adj):
-                self.restart_binner()
+                if self.remote is None:
+                        self.restart_binner()
 
         def hist_width_changed_cb(self, adj):
-                self.restart_binner()
+                if self.remote is None:
+                        self.restart_binner()
 
@@ -5,9 +5,13 @@ import logging
 
 class ManagedBinner(object):
     POLL_PERIOD = 2
-    def __init__(self, pipeline, name='managed_binner'):
+    def __init__(self, pipeline, name='managed_binner', remote=None):
+        """ If remote is given the binner follows the results published
+            by an analysis daemon at that endpoint instead of processing
+            the record stream itself. """
         self._cat = None
         self._binner = None
+        self.remote = remote
 
         self._zmq = zmq.Context.instance()
 
@@ -37,8 +41,11 @@ class ManagedBinner(object):
         if self._binner is not None:
             logging.warn("Binner already started")
             return
-        self._binner = self.create_binner()
-        self._cat = subprocess.Popen(['timetag-cat'], stdout=self._binner.get_data_fd())
+        if self.remote is not None:
+            self._binner = self.create_remote_binner(self.remote)
+        else:
+            self._binner = self.create_binner()
+            self._cat = subprocess.Popen(['timetag-cat'], stdout=self._binner.get_data_fd())
         self.on_started()
 
     def _stop_binner(self):
@@ -50,7 +57,9 @@ class ManagedBinner(object):
             self._binner = None
 
         # Remove output
-        if self._cat is None:
+        if self.remote is not None:
+            pass
+        elif self._cat is None:
             logging.warn("No associated output")
         else:
             self._cat.terminate()
@@ -75,7 +84,10 @@ class ManagedBinner(object):
         return self._binner
 
     def create_binner(self):
-        raise NotImplemented("ManagedBinner is an abstract class")
+        raise NotImplementedError("ManagedBinner is an abstract class")
+
+    def create_remote_binner(self, endpoint):
+        raise NotImplementedError("%s has no remote binner" % self.__class__.__name__)
 
     def is_running(self):
         return self._binner is not None
@@ -0,0 +1,95 @@
+import os
+import numpy as np
+
+# These mirror the definitions in record_format.h
+RECORD_LENGTH = 6
+TIME_BITS = 36
+TIME_MASK = (1 << TIME_BITS) - 1
+WRAP_PERIOD = (1 << TIME_BITS) - 1
+CHANNEL_SHIFT = TIME_BITS
+CHANNEL_MASK = 0xf << CHANNEL_SHIFT
+REC_TYPE_MASK = 1 << 45
+TIMER_WRAP_MASK = 1 << 46
+LOST_SAMPLE_MASK = 1 << 47
+
+record_dtype = np.dtype([('time', 'u8'),
+                         ('channels', 'u1'),
+                         ('delta', '?'),
+                         ('wrap', '?'),
+                         ('lost', '?')])
+
+def unpack_records(buf):
+    """ Unpack a buffer of big-endian records into 48-bit record words """
+    raw = np.frombuffer(buf, dtype='u1')
+    n = len(raw) // RECORD_LENGTH
+    # Pad each record out to a 64-bit big-endian word
+    words = np.zeros((n, 8), dtype='u1')
+    words[:,8-RECORD_LENGTH:] = raw[:n*RECORD_LENGTH].reshape(n, RECORD_LENGTH)
+    return words.view('>u8').ravel().astype('u8')
+
+def decode_records(data, time_offset=0, first=True):
+    """ Decode record words as read by unpack_records. Timer wraps are
+        handled as in record_stream: the wrap flag of the first record
+        of a stream is ignored. Returns the decoded records and the time
+        offset to pass when decoding the next batch of the stream. """
+    recs = np.empty(len(data), dtype=record_dtype)
+    recs['channels'] = (data & np.uint64(CHANNEL_MASK)) >> np.uint64(CHANNEL_SHIFT)
+    recs['delta'] = (data & np.uint64(REC_TYPE_MASK)) != 0
+    recs['wrap'] = (data & np.uint64(TIMER_WRAP_MASK)) != 0
+    recs['lost'] = (data & np.uint64(LOST_SAMPLE_MASK)) != 0
+
+    wraps = recs['wrap'].astype('u8')
+    if first and len(wraps) > 0:
+        wraps[0] = 0
+    offsets = np.cumsum(wraps) * np.uint64(WRAP_PERIOD) + np.uint64(time_offset)
+    recs['time'] = (data & np.uint64(TIME_MASK)) + offsets
+    if len(offsets) > 0:
+        time_offset = int(offsets[-1])
+    return recs, time_offset
+
+def channel_counts(recs, delta=False):
+    """ Count the photons seen on each of the four channels of a batch
+        of decoded records """
+    chans = recs['channels'][recs['delta'] == delta]
+    return [int(np.count_nonzero(chans & (1 << c))) for c in range(4)]
+
+class RecordReader(object):
+    """ Reads a .timetag file in chunks of decoded records. If the
+        recording was made in segments (see the 'segments' key of the
+        .meta sidecar) the time offset recorded for each segment is
+        applied so that timestamps remain absolute. """
+    def __init__(self, path, chunk_size=2**20, segments=None):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.segments = segments
+
+    def __len__(self):
+        return os.path.getsize(self.path) // RECORD_LENGTH
+
+    def __iter__(self):
+        if self.segments:
+            spans = [(s['record_offset'], s['n_records'], s['time_offset'])
+                     for s in self.segments]
+        else:
+            spans = [(0, len(self), 0)]
+
+        with open(self.path, 'rb') as f:
+            for start, length, time_offset in spans:
+                f.seek(start * RECORD_LENGTH)
+                first = True
+                while length > 0:
+                    n = min(length, self.chunk_size)
+                    buf = f.read(n * RECORD_LENGTH)
+                    if len(buf) < RECORD_LENGTH: break
+                    data = unpack_records(buf)
+                    recs, time_offset = decode_records(data, time_offset, first)
+                    first = False
+                    length -= len(recs)
+                    yield recs
+
+    def read(self):
+        """ Read the entire file into memory """
+        chunks = list(self)
+        if len(chunks) == 0:
+            return np.empty(0, dtype=record_dtype)
+        return np.concatenate(chunks)
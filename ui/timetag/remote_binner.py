@@ -0,0 +1,168 @@
+import logging
+import threading
+from time import time
+from collections import defaultdict
+import zmq
+import numpy as np
+
+from timetag.binner import BufferBinner, bin_dtype
+from timetag.change_point import ChangePointDetector
+from timetag.analysis_daemon import PROTOCOL_VERSION, default_endpoint, decode_frame
+
+class RemoteBinner(object):
+    """ Follows the results of a binner published by an analysis daemon,
+        presenting them with the interface of the corresponding local
+        binner. """
+    topic = None
+
+    def __init__(self, endpoint=default_endpoint):
+        self.endpoint = endpoint
+        self.clockrate = None
+        self.running = False
+        self.latest_timestamp = 0
+        self.loss_count = 0
+        self.last_bin_walltime = time()
+        self._epoch = None
+        self._seq = None
+        self._stopped = False
+
+        self.listener = threading.Thread(name='Remote Listener', target=self._listen)
+        self.listener.daemon = True
+        self.listener.start()
+
+    def stop(self):
+        self._stopped = True
+        self.listener.join()
+
+    def _listen(self):
+        sock = zmq.Context.instance().socket(zmq.SUB)
+        sock.connect(self.endpoint)
+        sock.setsockopt_string(zmq.SUBSCRIBE, self.topic)
+        resync_pending = True
+        while not self._stopped:
+            if not sock.poll(200): continue
+            topic, header, payload = decode_frame(sock.recv_multipart())
+            if topic != self.topic: continue
+            if header.get('version') != PROTOCOL_VERSION:
+                logging.warn('Unsupported analysis protocol version %s' % header.get('version'))
+                continue
+
+            if header['kind'] == 'snapshot':
+                new_epoch = header['epoch'] != self._epoch
+                self._epoch = header['epoch']
+                self._seq = header['seq']
+                resync_pending = False
+                self._handle_header(header)
+                self.handle_snapshot(header, payload, new_epoch)
+            elif header['epoch'] == self._epoch and header['seq'] == self._seq + 1:
+                self._seq = header['seq']
+                self._handle_header(header)
+                self.handle_delta(header, payload)
+            elif not resync_pending:
+                # We missed a frame; resubscribing requests a new snapshot
+                logging.debug('Lost sync with %s, resubscribing' % self.topic)
+                sock.setsockopt_string(zmq.UNSUBSCRIBE, self.topic)
+                sock.setsockopt_string(zmq.SUBSCRIBE, self.topic)
+                resync_pending = True
+        sock.close()
+
+    def _handle_header(self, header):
+        self.clockrate = header['clockrate']
+        self.running = header['running']
+        self.last_bin_walltime = time()
+
+    def handle_snapshot(self, header, payload, new_epoch):
+        pass
+
+    def handle_delta(self, header, payload):
+        pass
+
+class RemoteBufferBinner(RemoteBinner):
+    topic = 'bin-series'
+
+    def __init__(self, endpoint=default_endpoint):
+        self.channels = [ BufferBinner.Channel(1000) for i in range(4) ]
+        self.bin_time = None
+        self.n_points = 1000
+        self._step_args = None
+        RemoteBinner.__init__(self, endpoint)
+
+    def enable_step_detection(self, log=None, **kwargs):
+        """ Start detecting intensity steps in each channel's bins. See
+            ChangePointDetector for arguments. """
+        self._step_args = dict(kwargs, log=log)
+        for n,c in enumerate(self.channels):
+            with c._buffer_lock:
+                c.steps = ChangePointDetector(label=str(n), **self._step_args)
+
+    def _add_bins(self, header, payload, snapshot):
+        self.latest_timestamp = header['latest_timestamp']
+        self.loss_count = header['loss_count']
+        offset = 0
+        for n,(c,info) in enumerate(zip(self.channels, header['channels'])):
+            nbytes = info['n_bins'] * bin_dtype.itemsize
+            bins = np.frombuffer(payload[offset:offset+nbytes], dtype=bin_dtype)
+            offset += nbytes
+            with c._buffer_lock:
+                if snapshot:
+                    c.resize(self.n_points)
+                c.counts.extend(bins)
+                c.photon_count = info['photon_count']
+                if c.steps is not None:
+                    # Only bins we have not already seen
+                    for t, count in bins[bins['time'] > c.latest_timestamp]:
+                        c.steps.add_bin(t, count)
+                if len(bins) > 0:
+                    c.latest_timestamp = bins['time'][-1]
+
+    def handle_snapshot(self, header, payload, new_epoch):
+        self.bin_time = header['bin_time']
+        self.n_points = header['n_points']
+        if new_epoch:
+            for n,c in enumerate(self.channels):
+                with c._buffer_lock:
+                    c.latest_timestamp = 0
+                    if self._step_args is not None:
+                        c.steps = ChangePointDetector(label=str(n), **self._step_args)
+        if 'channels' in header:
+            self._add_bins(header, payload, snapshot=True)
+
+    def handle_delta(self, header, payload):
+        if 'channels' in header:
+            self._add_bins(header, payload, snapshot=False)
+
+class RemoteHistBinner(RemoteBinner):
+    topic = 'hist'
+
+    def __init__(self, endpoint=default_endpoint):
+        self.bin_time = None
+        self.hist_width = 1
+        self.channels = [ defaultdict(lambda: 0) for c in range(4) ]
+        RemoteBinner.__init__(self, endpoint)
+
+    def handle_snapshot(self, header, payload, new_epoch):
+        self.bin_time = header['bin_time']
+        self.hist_width = header['hist_width']
+        if 'channels' in header:
+            self.channels = [ defaultdict(lambda: 0, h) for h in header['channels'] ]
+
+class RemoteFretHistBinner(RemoteBinner):
+    topic = 'fret-hist'
+
+    def __init__(self, endpoint=default_endpoint):
+        self.bin_time = None
+        self.hist_width = 0.025
+        self.threshold = None
+        self.donor_channel = 0
+        self.acceptor_channel = 1
+        self.hist = defaultdict(lambda: 0)
+        RemoteBinner.__init__(self, endpoint)
+
+    def handle_snapshot(self, header, payload, new_epoch):
+        self.bin_time = header['bin_time']
+        self.hist_width = header['hist_width']
+        self.threshold = header['threshold']
+        self.donor_channel = header['donor_channel']
+        self.acceptor_channel = header['acceptor_channel']
+        if 'hist' in header:
+            self.hist = defaultdict(lambda: 0, header['hist'])
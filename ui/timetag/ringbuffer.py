@@ -53,6 +53,17 @@ class RingBuffer:
         def get_unordered(self):
                 return self._data[:self._cur]
 
+        def extend(self, xs):
+                """ append a sequence of elements at the end of the buffer """
+                xs = xs[-self._size:]
+                n = min(len(xs), self._size - self._cur)
+                self._data[self._cur:self._cur+n] = xs[:n]
+                self._data[:len(xs)-n] = xs[n:]
+                self._cur += len(xs)
+                if self._cur >= self._size:
+                        self._cur -= self._size
+                        self.__class__ = RingBuffer.RingBufferFull
+
 
         class RingBufferFull:
                 def append(self, x):
@@ -66,3 +77,10 @@ class RingBuffer:
                 def get_unordered(self):
                         return self._data
 
+                def extend(self, xs):
+                        xs = xs[-self._size:]
+                        n = min(len(xs), self._size - self._cur)
+                        self._data[self._cur:self._cur+n] = xs[:n]
+                        self._data[:len(xs)-n] = xs[n:]
+                        self._cur = (self._cur+len(xs)) % self._size
+
@@ -0,0 +1,199 @@
+import logging
+import threading
+import os
+import fcntl
+import json
+import numpy as np
+
+from timetag.records import RECORD_LENGTH, TIME_MASK, unpack_records, decode_records
+
+buffered_dtype = np.dtype([('data', 'u8'), ('time', 'u8')])
+
+def pack_records(data):
+    """ Pack record words back into the big-endian on-disk format """
+    words = np.asarray(data << np.uint64(16), dtype='>u8')
+    return words.view('u1').reshape(-1, 8)[:,:RECORD_LENGTH].tobytes()
+
+class TriggeredRecorder(object):
+    """ A recording sink which only writes the records surrounding bursts
+        of activity to disk.
+
+        Records are written to the pipe given by fileno() (e.g. as the
+        stdout of timetag-cat). A trigger fires when any of the trigger
+        channels sees threshold photons within window seconds. Each
+        trigger opens (or extends) a segment beginning pre_trigger seconds
+        before and ending post_trigger seconds after the trigger. After a
+        segment ends no new trigger is accepted for holdoff seconds. The
+        records of the last pre_trigger seconds, up to buffer_length of
+        them, are held as context for the next chunk.
+
+        Since timer wrap records falling between segments are lost, the
+        record offset and time offset of each segment are added to the
+        'segments' key of the .meta sidecar when the recorder is closed.
+    """
+    def __init__(self, filename, clockrate, channels=range(4), threshold=10,
+                 window=1e-3, pre_trigger=10e-3, post_trigger=10e-3, holdoff=0,
+                 buffer_length=2**20, chunk_size=2**14):
+        self.name = filename
+        self.clockrate = clockrate
+        self.channels = list(channels)
+        self.threshold = threshold
+        self.window = int(window * clockrate)
+        self.pre_trigger = int(pre_trigger * clockrate)
+        self.post_trigger = int(post_trigger * clockrate)
+        self.holdoff = int(holdoff * clockrate)
+        self.chunk_size = chunk_size
+        self.buffer_length = buffer_length
+
+        self.segments = []
+        self.records_seen = 0
+        self.records_written = 0
+
+        self._file = open(filename, 'wb')
+        self._history = np.empty(0, dtype=buffered_dtype)
+        self._tails = {c: np.empty(0, dtype='u8') for c in self.channels}
+        self._time_offset = 0
+        self._open_until = None  # end time of the open segment
+        self._rearm_at = 0       # time after which triggers are accepted
+        self._next_unwritten = 0 # absolute index of the record following the last written
+
+        r, w = os.pipe()
+        # Keep other children (e.g. plot windows) from inheriting the
+        # write end and holding the pipe open past close()
+        for fd in (r, w):
+            fcntl.fcntl(fd, fcntl.F_SETFD, fcntl.fcntl(fd, fcntl.F_GETFD) | fcntl.FD_CLOEXEC)
+        self._pipe_r = os.fdopen(r, 'rb')
+        self._pipe_w = w
+        self.listener = threading.Thread(name='Triggered Recorder', target=self._listen)
+        self.listener.daemon = True
+        self.listener.start()
+
+    def fileno(self):
+        return self._pipe_w
+
+    def close(self):
+        """ Finish recording once the writer has closed its end of the
+            pipe and record the segments in the .meta sidecar """
+        if self._pipe_w is None: return
+        os.close(self._pipe_w)
+        self._pipe_w = None
+        self.listener.join()
+
+        if self._open_until is not None:
+            self._close_segment()
+        self._file.close()
+        logging.info('Triggered recording: wrote %d of %d records in %d segments' %
+                     (self.records_written, self.records_seen, len(self.segments)))
+        self._write_meta()
+
+    def _write_meta(self):
+        meta_file = self.name + '.meta'
+        metadata = {}
+        if os.path.exists(meta_file):
+            metadata = json.load(open(meta_file))
+        metadata['trigger'] = {
+            'channels': self.channels,
+            'threshold': self.threshold,
+            'window': 1. * self.window / self.clockrate,
+            'pre trigger': 1. * self.pre_trigger / self.clockrate,
+            'post trigger': 1. * self.post_trigger / self.clockrate,
+            'holdoff': 1. * self.holdoff / self.clockrate,
+        }
+        metadata['segments'] = self.segments
+        json.dump(metadata, open(meta_file, 'w'), indent=2)
+
+    def _listen(self):
+        chunk_bytes = self.chunk_size * RECORD_LENGTH
+        while True:
+            buf = self._pipe_r.read(chunk_bytes)
+            if len(buf) < RECORD_LENGTH: break
+            self._handle_chunk(unpack_records(buf))
+        self._pipe_r.close()
+
+    def _find_triggers(self, recs):
+        """ Find the times of photons completing a burst of threshold
+            photons within the trigger window """
+        n = self.threshold - 1
+        strobes = recs[~recs['delta']]
+        triggers = []
+        for c in self.channels:
+            times = strobes['time'][(strobes['channels'] & (1 << c)) != 0]
+            tail = self._tails[c]
+            t = np.concatenate([tail, times])
+            if len(t) > n:
+                k = np.arange(max(n, len(tail)), len(t))
+                triggers.append(t[k][t[k] - t[k-n] < self.window])
+            self._tails[c] = t[len(t)-n:] if n > 0 else t[:0]
+
+        if len(triggers) == 0:
+            return np.empty(0, dtype='u8')
+        return np.unique(np.concatenate(triggers))
+
+    def _handle_chunk(self, data):
+        recs, self._time_offset = decode_records(data, self._time_offset,
+                                                 first=self.records_seen == 0)
+        triggers = self._find_triggers(recs)
+
+        history = self._history
+        buf = np.empty(len(history) + len(recs), dtype=buffered_dtype)
+        buf[:len(history)] = history
+        buf['data'][len(history):] = data
+        buf['time'][len(history):] = recs['time']
+        times = buf['time']
+
+        # Absolute index of the first record of buf
+        first_idx = self.records_seen - len(history)
+        # Index into buf of the first record not yet considered for writing
+        pos = max(len(history), self._next_unwritten - first_idx)
+        ti = 0
+        while True:
+            if self._open_until is not None:
+                # Retrigger: extend the segment to cover triggers within it
+                while ti < len(triggers) and triggers[ti] <= self._open_until:
+                    ti = np.searchsorted(triggers, self._open_until, 'right')
+                    self._open_until = int(triggers[ti-1]) + self.post_trigger
+
+                end = np.searchsorted(times, self._open_until, 'right')
+                self._write(buf[pos:end])
+                self._next_unwritten = first_idx + end
+                pos = end
+                if end == len(buf): break
+                self._close_segment()
+            else:
+                ti = max(ti, np.searchsorted(triggers, self._rearm_at, 'left'))
+                if ti >= len(triggers): break
+                t = int(triggers[ti])
+                # Start with the buffered context preceding the trigger
+                # which hasn't already been written
+                pos = max(np.searchsorted(times, max(t - self.pre_trigger, 0), 'left'),
+                          self._next_unwritten - first_idx)
+                self._open_segment(buf[pos])
+                self._open_until = t + self.post_trigger
+
+        self.records_seen += len(recs)
+        # Any trigger in a later chunk falls after the last record of
+        # this one, so only the last pre_trigger seconds are needed
+        keep = np.searchsorted(times, max(int(times[-1]) - self.pre_trigger, 0), 'left')
+        self._history = buf[max(keep, len(buf) - self.buffer_length):]
+
+    def _open_segment(self, rec):
+        time = int(rec['time'])
+        self.segments.append({
+            'record_offset': self.records_written,
+            'n_records': 0,
+            'time_offset': time - (int(rec['data']) & TIME_MASK),
+            'start_time': time,
+            'end_time': time,
+        })
+
+    def _write(self, recs):
+        if len(recs) == 0: return
+        self._file.write(pack_records(recs['data']))
+        s = self.segments[-1]
+        s['n_records'] += len(recs)
+        s['end_time'] = int(recs['time'][-1])
+        self.records_written += len(recs)
+
+    def _close_segment(self):
+        self._rearm_at = self._open_until + self.holdoff
+        self._open_until = None